@@ -1,6 +1,3 @@
-import requests
-import config
-from PIL import Image, ImageOps
 from io import BytesIO
 import os
 import random
@@ -10,9 +7,12 @@ import argparse
 # Base URL for the API
 api_url = "https://cilia.crbs.ucsd.edu/rest"
 
-# Authentication details
-username = config.CIL_API_USER
-password = config.CIL_API_PW
+# Authentication details are read from config when first needed, so that
+# --help and --dry-run work without credentials or network access
+def get_credentials():
+    import config
+
+    return config.CIL_API_USER, config.CIL_API_PW
 
 # Define the fields for CCDB images
 ccdb_fields = [
@@ -26,6 +26,8 @@ def adjust_to_cinema_aspect(image, cinema_aspect_ratio=2.39, output_size=(1920,
     """
     Adjusts the given image to a cinema aspect ratio (2.39:1) by cropping or padding as necessary.
     """
+    from PIL import Image, ImageOps
+
     width, height = image.size
     img_aspect_ratio = width / height
 
@@ -45,6 +47,10 @@ def adjust_to_cinema_aspect(image, cinema_aspect_ratio=2.39, output_size=(1920,
 
 # Function to get a random image from the API and adjust to cinema aspect ratio
 def download_image(image_id, output_folder):
+    import requests
+    from PIL import Image
+
+    username, password = get_credentials()
     try:
         # Fetch the document data from the API
         response = requests.get(f"{api_url}/public_documents/{image_id}", auth=(username, password), timeout=5)
@@ -104,16 +110,26 @@ def download_image(image_id, output_folder):
     except Exception as e:
         print(f"An error occurred for image ID: {image_id}. Error details: {str(e)}")
 
-def main(num_images, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+# Fetch the list of public IDs
+def fetch_public_ids():
+    import requests
 
-    # Fetch the list of public IDs
+    username, password = get_credentials()
     response = requests.get(f"{api_url}/public_ids?from=0&size=50000", auth=(username, password))
     response.raise_for_status()
 
     # Get the list of IDs
-    ids = [hit['_id'] for hit in response.json()['hits']['hits']]
+    return [hit['_id'] for hit in response.json()['hits']['hits']]
+
+def main(num_images, output_folder, dry_run=False):
+    if dry_run:
+        print(f"Would download {num_images} images from {api_url} to {output_folder}")
+        return
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    ids = fetch_public_ids()
 
     # Randomly shuffle the list of IDs
     random.seed(time.time())
@@ -130,10 +146,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download images from the CIL API and adjust to cinema aspect ratio")
     parser.add_argument("num_images", type=int, help="Number of images to download")
     parser.add_argument("output_folder", help="Path to the output folder for downloaded images")
+    parser.add_argument("--dry-run", action="store_true", help="Print the download plan without fetching anything")
 
     args = parser.parse_args()
 
     num_images = args.num_images
     output_folder = args.output_folder
 
-    main(num_images, output_folder)
+    main(num_images, output_folder, dry_run=args.dry_run)
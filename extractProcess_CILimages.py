@@ -1,24 +1,11 @@
-import requests
-import config
-from PIL import Image
-from PIL import ImageOps
 from io import BytesIO
 import os
 import random
 import time
-import numpy as np
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+import argparse
 
-
-# Record the start time
-start_time = time.time()
-
-try:
-    with open('processed_images.txt', 'r') as file:
-        processed_ids = set(line.strip() for line in file)
-except FileNotFoundError:
-    processed_ids = set()
+# requests, PIL, numpy and config are imported inside the functions that use
+# them, so that --help, --dry-run and worker processes start without loading them
 
 # Define the number of images to download
 num_images = 4000
@@ -26,12 +13,30 @@ num_images = 4000
 # Define the output folder
 output_folder = "output/cinema_99"
 
+# IDs listed in this file are skipped
+processed_images_file = "processed_images.txt"
+
+# define a final output aspect ratio
+# crop_ratio = 16/9 # widescreen
+# crop_ratio = 2.35/1 # cinemascope
+crop_ratio = 4/3 # u know
+
 # Base URL for the API
 api_url = "https://cilia.crbs.ucsd.edu/rest"
 
-# Authentication details
-username = config.CIL_API_USER
-password = config.CIL_API_PW
+# Authentication details are read from config when first needed
+def get_credentials():
+    import config
+
+    return config.CIL_API_USER, config.CIL_API_PW
+
+# Load the IDs of previously processed images
+def load_processed_ids(path=processed_images_file):
+    try:
+        with open(path, 'r') as file:
+            return set(line.strip() for line in file)
+    except FileNotFoundError:
+        return set()
 
 # Define the fields for CCDB images
 ccdb_fields = [
@@ -43,6 +48,9 @@ ccdb_fields = [
 # Identify and crop any letterbox around the image
 # higher sensitivity considers more grey values +/- 0 to 255 aka pure white/black
 def crop_image(image, sensitivity=1):
+    import numpy as np
+    from PIL import Image
+
     # Convert the image to a NumPy array
     image_data = np.array(image)
 
@@ -81,6 +89,8 @@ def calculate_brightness(image):
         return None
 
 def calculate_contrast(image):
+    import numpy as np
+
     try:
         grayscale = image.convert('L')
         grayscale_array = np.array(grayscale)
@@ -93,6 +103,8 @@ def calculate_contrast(image):
         return None
     
 def calculate_entropy(image):
+    import numpy as np
+
     try:
         # Convert the image to grayscale
         grayscale = image.convert('L')
@@ -117,7 +129,9 @@ def calculate_entropy(image):
 
 # Process the image using Floyd-Steinberg error diffusion
 def process_image(image):
-    
+    import numpy as np
+    from PIL import Image
+
     # Check the input image resolution
     min_resolution = 144  # Set minimum resolution
     width, height = image.size
@@ -173,17 +187,28 @@ def process_image(image):
     return image
 
 
-# Configure retries
-retry_strategy = Retry(
-    total=5,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["HEAD", "GET", "OPTIONS"],
-    backoff_factor=1
-)
-adapter = HTTPAdapter(max_retries=retry_strategy)
-http = requests.Session()
-http.mount("https://", adapter)
-http.mount("http://", adapter)
+# Session with retries, created on first use (once per process)
+_http = None
+
+def get_session():
+    global _http
+    if _http is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import Retry
+
+        # Configure retries
+        retry_strategy = Retry(
+            total=5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+            backoff_factor=1
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy)
+        _http = requests.Session()
+        _http.mount("https://", adapter)
+        _http.mount("http://", adapter)
+    return _http
 
 
 # Function to crop image to a specific aspect ratio
@@ -211,10 +236,15 @@ def crop_to_aspect_ratio(image, target_ratio):
 
 
 
-def download_and_maybe_process_image(image_id, process=True, crop_ratio=None):
+def download_and_maybe_process_image(image_id, process=True, crop_ratio=None,
+                                     output_folder=output_folder, processed_ids=frozenset()):
+    import requests
+    from PIL import Image
+
+    username, password = get_credentials()
     try:
         # Fetch the document data from the API
-        response = http.get(f"{api_url}/public_documents/{image_id}", auth=(username, password))
+        response = get_session().get(f"{api_url}/public_documents/{image_id}", auth=(username, password))
         response.raise_for_status()
         data = response.json()
 
@@ -322,49 +352,77 @@ def download_and_maybe_process_image(image_id, process=True, crop_ratio=None):
 
     return False
 
-# alternatively, use a seed for pseudo-random ID shuffle
-# random.seed(666)
-# random.shuffle(ids)
-
 # Fetch the list of public IDs
-response = requests.get(f"{api_url}/public_ids?from=0&size=50000", auth=(username, password))
-response.raise_for_status()
+def fetch_public_ids():
+    import requests
 
-# Get the list of IDs
-ids = [hit['_id'] for hit in response.json()['hits']['hits']]
+    username, password = get_credentials()
+    response = requests.get(f"{api_url}/public_ids?from=0&size=50000", auth=(username, password))
+    response.raise_for_status()
 
-# Filter the IDs to only include those up to 50000 to avoid placeholder images
-ids = [id for id in ids if int(id[4:]) <= 50000]  # Assumes all IDs start with 'CIL_' which they seem to
+    # Get the list of IDs
+    ids = [hit['_id'] for hit in response.json()['hits']['hits']]
 
-# Randomly shuffle the list of IDs
-# with new seed for random based on current time
-random.seed(time.time())
-random.shuffle(ids)
+    # Filter the IDs to only include those up to 50000 to avoid placeholder images
+    return [id for id in ids if int(id[4:]) <= 50000]  # Assumes all IDs start with 'CIL_' which they seem to
 
-# Initialize counter for downloaded images
-downloaded_images = 0
+def main(num_images=num_images, output_folder=output_folder, process=True, crop_ratio=crop_ratio, dry_run=False):
+    # Record the start time
+    start_time = time.time()
 
-# Initialize an index for the IDs list
-index = 0
+    if dry_run:
+        print(f"would download {num_images} images from {api_url} to {output_folder} "
+              f"(process={process}, crop_ratio={crop_ratio})")
+        return
 
-# define a final output aspect ratio
-# crop_ratio = 16/9 # widescreen
-# crop_ratio = 2.35/1 # cinemascope
-crop_ratio = 4/3 # u know
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    processed_ids = load_processed_ids()
+
+    ids = fetch_public_ids()
+
+    # alternatively, use a seed for pseudo-random ID shuffle
+    # random.seed(666)
+    # random.shuffle(ids)
+
+    # Randomly shuffle the list of IDs
+    # with new seed for random based on current time
+    random.seed(time.time())
+    random.shuffle(ids)
+
+    # Initialize counter for downloaded images
+    downloaded_images = 0
+
+    # Initialize an index for the IDs list
+    index = 0
+
+    while downloaded_images < num_images and index < len(ids):
+        # Call with process=True to process the image or process=False to just download
+        if download_and_maybe_process_image(ids[index], process=process, crop_ratio=crop_ratio,
+                                            output_folder=output_folder, processed_ids=processed_ids):
+            downloaded_images += 1
+            print(f"downloading {ids[index]} ({downloaded_images} of {min(num_images, len(ids))})")
+        index += 1
+
+    print("done.")
+    # Record the end time
+    end_time = time.time()
 
+    # Calculate and print the total execution time
+    total_time_sec= end_time - start_time
+    total_time_min=total_time_sec/60
+    print(f"total runtime: {round(total_time_min, 2)} minutes")
 
-while downloaded_images < num_images and index < len(ids):
-    # Call with process=True to process the image or process=False to just download
-    if download_and_maybe_process_image(ids[index], process=True, crop_ratio=crop_ratio):
-        downloaded_images += 1
-        print(f"downloading {ids[index]} ({downloaded_images} of {min(num_images, len(ids))})")
-    index += 1
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and dither images from the CIL API")
+    parser.add_argument("num_images", type=int, nargs="?", default=num_images, help="Number of images to download")
+    parser.add_argument("output_folder", nargs="?", default=output_folder, help="Path to the output folder for processed images")
+    parser.add_argument("--crop-ratio", type=float, default=crop_ratio, help="Target aspect ratio to crop to (0 to disable)")
+    parser.add_argument("--no-process", action="store_true", help="Save the cropped images without dithering")
+    parser.add_argument("--dry-run", action="store_true", help="Print the download plan without fetching anything")
 
-print("done.")
-# Record the end time
-end_time = time.time()
+    args = parser.parse_args()
 
-# Calculate and print the total execution time
-total_time_sec= end_time - start_time
-total_time_min=total_time_sec/60
-print(f"total runtime: {round(total_time_min, 2)} minutes")
\ No newline at end of file
+    main(args.num_images, args.output_folder, process=not args.no_process,
+         crop_ratio=args.crop_ratio or None, dry_run=args.dry_run)